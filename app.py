@@ -1,6 +1,10 @@
+import io
 import re
 import os
-from typing import List, Dict
+import threading
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple
 import streamlit as st
 
 try:
@@ -8,6 +12,11 @@ try:
 except ImportError:
     raise ImportError("Please install pymupdf: pip install pymupdf")
 
+try:
+    import hyperscan  # optional, SIMD multi-pattern matching
+except ImportError:
+    hyperscan = None
+
 SUPPORTED_PROCEDURES = [
     "hip replacement", "knee replacement", "joint surgery", "bypass surgery", "appendectomy",
     "angioplasty", "cataract surgery", "dialysis", "organ transplant", "liver transplant",
@@ -15,75 +24,228 @@ SUPPORTED_PROCEDURES = [
     "craniotomy", "tumor removal", "cardiac surgery", "brain surgery", "knee surgery"
 ]
 
+# Single alternation over all procedures, longest first so that overlapping
+# names resolve to the most specific one.
+_PROC_RE = re.compile(
+    "|".join(re.escape(p) for p in sorted(SUPPORTED_PROCEDURES, key=len, reverse=True)),
+    re.IGNORECASE
+)
+
+_LOC_RE = re.compile(r'in\s+([a-zA-Z]+)', re.IGNORECASE)
+
+# Age and duration share one pass. Both must start with digits followed directly
+# by "year", "M" or "month"/"mo", so their matches never overlap. Procedure and
+# location are searched separately: "in\s+" can swallow the start of a procedure.
+_NUMERIC_RE = re.compile(
+    r'(?P<age>\d{2})[- ]?year[- ]?old'
+    r'|\b(?P<agem>\d{2})M\b'
+    r'|(?P<dur>\d+)[- ]?(?:month|mo)(?:[- ]?(?:policy|old))?',
+    re.IGNORECASE
+)
+
+# PyMuPDF's default "text" flags, minus ligature preservation, so that "ﬁ" and
+# similar expand to plain letters that procedure names can match.
+_PDF_TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
+
+_DOC_EXTENSIONS = {"txt", "pdf"}
+
+_WS_TABLE = str.maketrans({'\n': ' ', '\r': ' ', '\t': ' '})
+
+_PROC_IDS = {p: i for i, p in enumerate(SUPPORTED_PROCEDURES)}
+
+def _build_proc_db():
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[re.escape(p).encode() for p in SUPPORTED_PROCEDURES],
+        ids=list(range(len(SUPPORTED_PROCEDURES))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(SUPPORTED_PROCEDURES)
+    )
+    return db
+
+_PROC_DB = _build_proc_db() if hyperscan else None
+
+# Database.scan uses the database's single scratch space by default, and
+# Streamlit runs each session on its own thread, so every thread gets its own.
+_scratch_local = threading.local()
+
+def _proc_scratch():
+    scratch = getattr(_scratch_local, 'scratch', None)
+    if scratch is None:
+        scratch = _scratch_local.scratch = hyperscan.Scratch(_PROC_DB)
+    return scratch
+
+def _scan_procedures(data: bytes) -> Dict[int, List[Tuple[int, int]]]:
+    """One pass over data, returning the match spans of every procedure by id."""
+    spans = {}
+
+    def on_match(match_id, match_start, match_end, flags, context):
+        spans.setdefault(match_id, []).append((match_start, match_end))
+
+    _PROC_DB.scan(data, match_event_handler=on_match, scratch=_proc_scratch())
+    return spans
+
+_QUERY_FIELDS = ("age", "procedure", "location", "policy_duration_months")
+
+@lru_cache(maxsize=1024)
+def _parse_query(query: str) -> tuple:
+    age = policy_duration = None
+
+    # Cheap literal checks first: these patterns cannot match without them.
+    has_digit = any(c.isdigit() for c in query)
+
+    # The first match of each field wins, as with a separate search per field.
+    for match in _NUMERIC_RE.finditer(query) if has_digit else ():
+        group = match.lastgroup
+        if group in ("age", "agem"):
+            if age is None:
+                age = int(match.group(group))
+        elif policy_duration is None:
+            policy_duration = int(match.group(group))
+        if age is not None and policy_duration is not None:
+            break
+
+    procedure_match = _PROC_RE.search(query)
+    procedure = procedure_match.group(0).lower() if procedure_match else None
+    location_match = _LOC_RE.search(query) if 'in' in query.lower() else None
+    location = location_match.group(1) if location_match else None
+
+    return age, procedure, location, policy_duration
+
 class QueryParser:
     def parse(self, query: str) -> Dict:
-        age_match = re.search(r'(\d{2})[- ]?year[- ]?old|\b(\d{2})M\b', query, re.IGNORECASE)
-        location_match = re.search(r'in\s+([a-zA-Z]+)', query, re.IGNORECASE)
-        policy_duration_match = re.search(r'(\d+)[- ]?(month|mo)[- ]?(policy|old)?', query, re.IGNORECASE)
-
-        matched_procedure = None
-        for procedure in SUPPORTED_PROCEDURES:
-            if re.search(procedure, query, re.IGNORECASE):
-                matched_procedure = procedure
-                break
-
-        return {
-            "age": int(age_match.group(1) or age_match.group(2)) if age_match else None,
-            "procedure": matched_procedure,
-            "location": location_match.group(1) if location_match else None,
-            "policy_duration_months": int(policy_duration_match.group(1)) if policy_duration_match else None
-        }
+        return dict(zip(_QUERY_FIELDS, _parse_query(query)))
 
 class DocumentLoader:
-    def load_documents(self, folder_path="dataset") -> (List[str], List[str]):
-        docs, filenames = [], []
+    def load_documents(self, folder_path="dataset") -> (List[bytes], List[str]):
+        """Read every document from disk, uncached. The app uses load_retriever."""
+        self._check_folder(folder_path)
+        return _read_documents(folder_path)
+
+    def load_retriever(self, folder_path="dataset") -> "ClauseRetriever":
+        return _load_retriever(folder_path, self._dataset_key(folder_path))
 
+    @staticmethod
+    def _check_folder(folder_path: str):
         if not os.path.exists(folder_path):
             raise FileNotFoundError("The 'dataset' folder does not exist.")
 
-        for filename in os.listdir(folder_path):
-            path = os.path.join(folder_path, filename)
-            if filename.endswith(".txt"):
-                with open(path, 'r', encoding='utf-8') as f:
-                    docs.append(f.read())
-                    filenames.append(filename)
-            elif filename.endswith(".pdf"):
-                docs.append(self.extract_text_from_pdf(path))
-                filenames.append(filename)
+    @staticmethod
+    def _dataset_key(folder_path: str) -> tuple:
+        DocumentLoader._check_folder(folder_path)
 
-        if not docs:
-            raise FileNotFoundError("No valid documents found in 'dataset/'.")
+        # Cache key: re-parse only when a file is added, removed or modified.
+        return tuple(sorted(
+            (entry.name, entry.stat().st_mtime) for entry in _scan_documents(folder_path)
+        ))
 
-        return docs, filenames
-
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        text = ""
+    @staticmethod
+    def extract_text_from_pdf(pdf_path: str) -> str:
+        # Streaming accumulator: pages can be handled as they are extracted.
+        buf = io.StringIO()
         with fitz.open(pdf_path) as doc:
             for page in doc:
-                text += page.get_text()
-        return text
+                buf.write(page.get_text("text", flags=_PDF_TEXT_FLAGS))
+        return buf.getvalue()
+
+def _scan_documents(folder_path: str) -> List[os.DirEntry]:
+    with os.scandir(folder_path) as it:
+        return [
+            entry for entry in it
+            if entry.is_file() and entry.name.rpartition('.')[2].lower() in _DOC_EXTENSIONS
+        ]
+
+def _read_document(path: str) -> bytes:
+    if path.rpartition('.')[2].lower() == "txt":
+        with open(path, 'rb') as f:
+            data = f.read()
+        data.decode('utf-8')  # reject non-UTF-8 files, as the text-mode read did
+        return data
+    return DocumentLoader.extract_text_from_pdf(path).encode('utf-8', 'ignore')
+
+def _read_documents(folder_path: str) -> (List[bytes], List[str]):
+    entries = _scan_documents(folder_path)
+    if not entries:
+        raise FileNotFoundError("No valid documents found in 'dataset/'.")
+
+    docs = [_read_document(entry.path) for entry in entries]
+
+    return docs, [entry.name for entry in entries]
+
+@dataclass(slots=True)
+class Document:
+    name: str
+    data: bytes  # UTF-8 encoded text
+    data_lower: bytes  # ASCII-lowercased, same offsets as data
+    length: int
+    proc_spans: Dict[int, List[Tuple[int, int]]] = field(default_factory=dict)  # Hyperscan only
 
 class ClauseRetriever:
-    def __init__(self, documents: List[str], filenames: List[str]):  # ✅ FIXED constructor
-        self.documents = documents
-        self.filenames = filenames
+    def __init__(self, documents: List[bytes], filenames: List[str]):  # ✅ FIXED constructor
+        self.documents = [
+            Document(
+                name=fname,
+                data=doc,
+                data_lower=doc.lower(),
+                length=len(doc),
+                proc_spans=_scan_procedures(doc) if _PROC_DB else {}
+            )
+            for doc, fname in zip(documents, filenames)
+        ]
 
-    def retrieve_clauses(self, parsed_query: Dict) -> List[Dict]:
-        clauses = []
+    def retrieve_clauses(self, parsed_query: Dict) -> List[Tuple[str, int, int, int]]:
+        """Return (filename, doc_index, start, end) spans; see get_snippet."""
         proc = parsed_query.get('procedure')
         if not proc:
             return []
 
-        for doc, fname in zip(self.documents, self.filenames):
-            for match in re.finditer(re.escape(proc), doc, re.IGNORECASE):
-                start = max(0, match.start() - 100)
-                end = min(len(doc), match.end() + 200)
-                snippet = doc[start:end].strip().replace('\n', ' ')
-                clauses.append({"clause": snippet, "document": fname})
+        proc_lower = proc.lower()
+        if _PROC_DB is not None and proc_lower in _PROC_IDS:
+            return self._retrieve_hyperscan(_PROC_IDS[proc_lower])
+        return self._retrieve_find(proc_lower.encode('utf-8'))
+
+    def get_snippet(self, clause: Tuple[str, int, int, int]) -> str:
+        _, doc_idx, start, end = clause
+        # Decode straight from a view of the document, without an intermediate bytes copy.
+        view = memoryview(self.documents[doc_idx].data)[start:end]
+        return str(view, 'utf-8', 'ignore').translate(_WS_TABLE).strip()
+
+    def _retrieve_find(self, proc_bytes: bytes) -> List[Tuple[str, int, int, int]]:
+        clauses = []
+        for doc_idx, doc in enumerate(self.documents):
+            i = doc.data_lower.find(proc_bytes)
+            while i != -1:
+                match_end = i + len(proc_bytes)
+                clauses.append(self._clause(doc_idx, doc, i, match_end))
+                i = doc.data_lower.find(proc_bytes, match_end)
         return clauses
 
+    def _retrieve_hyperscan(self, proc_id: int) -> List[Tuple[str, int, int, int]]:
+        # Every procedure was matched in the single scan done in __init__.
+        return [
+            self._clause(doc_idx, doc, match_start, match_end)
+            for doc_idx, doc in enumerate(self.documents)
+            for match_start, match_end in doc.proc_spans.get(proc_id, ())
+        ]
+
+    @staticmethod
+    def _clause(doc_idx: int, doc: Document, match_start: int, match_end: int) -> Tuple[str, int, int, int]:
+        # The window is 100 characters before and 200 after the match, not bytes.
+        # A UTF-8 character is at most 4 bytes, so these slices always hold enough;
+        # a character cut at the outer edge is dropped, landing on a boundary.
+        before = doc.data[max(0, match_start - 400):match_start].decode('utf-8', 'ignore')[-100:]
+        after = doc.data[match_end:match_end + 800].decode('utf-8', 'ignore')[:200]
+        start = match_start - len(before.encode('utf-8'))
+        end = match_end + len(after.encode('utf-8'))
+        return doc.name, doc_idx, start, end
+
+# Only the current dataset is kept; older versions are evicted on change.
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_retriever(folder_path: str, mtime_key: tuple) -> ClauseRetriever:
+    # Read uncached: the retriever already holds the corpus.
+    return ClauseRetriever(*_read_documents(folder_path))
+
 class DecisionEvaluator:
-    def evaluate(self, parsed_query: Dict, clauses: List[Dict]) -> str:
+    def evaluate(self, parsed_query: Dict, clauses: List[Tuple[str, int, int, int]]) -> str:
         procedure = parsed_query.get("procedure")
         policy_duration = parsed_query.get("policy_duration_months")
 
@@ -108,21 +270,23 @@ if query:
     parser = QueryParser()
     parsed_query = parser.parse(query)
 
-    loader = DocumentLoader()
-    try:
-        documents, filenames = loader.load_documents()
-    except FileNotFoundError as e:
-        st.error(str(e))
-        st.stop()
+    # Without a procedure there is nothing to search for, so skip loading.
+    matched_clauses = []
+    if parsed_query["procedure"]:
+        loader = DocumentLoader()
+        try:
+            retriever = loader.load_retriever()
+        except FileNotFoundError as e:
+            st.error(str(e))
+            st.stop()
 
-    retriever = ClauseRetriever(documents, filenames)
-    matched_clauses = retriever.retrieve_clauses(parsed_query)
+        matched_clauses = retriever.retrieve_clauses(parsed_query)
 
     st.subheader("🔍 Matched Clauses")
     if matched_clauses:
         for clause in matched_clauses:
-            st.markdown(f"**From `{clause['document']}`:**")
-            st.info(clause['clause'])
+            st.markdown(f"**From `{clause[0]}`:**")
+            st.info(retriever.get_snippet(clause))
     else:
         st.warning("No relevant clauses found.")
 
@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("fitz")
+
+import app
+
+DOCUMENTS = [
+    b"Knee Surgery is covered after 24 months. Cataract surgery: 12 months.\nknee surgery again",
+    "Exclusions: cosmetic procedures. Dialysis \u2014 covered.".encode("utf-8"),
+    b"No procedures here.",
+    "; ".join(p.title() for p in app.SUPPORTED_PROCEDURES).encode("utf-8"),
+]
+FILENAMES = ["a.txt", "b.pdf", "c.txt", "all.txt"]
+
+
+def test_find_returns_every_match_with_context():
+    retriever = app.ClauseRetriever(DOCUMENTS, FILENAMES)
+    clauses = retriever._retrieve_find(b"knee surgery")
+    assert [c[:2] for c in clauses] == [("a.txt", 0), ("a.txt", 0), ("all.txt", 3)]
+    assert "Knee Surgery is covered" in retriever.get_snippet(clauses[0])
+
+
+@pytest.mark.skipif(app._PROC_DB is None, reason="hyperscan is not installed")
+@pytest.mark.parametrize("procedure", app.SUPPORTED_PROCEDURES)
+def test_hyperscan_matches_find(procedure):
+    retriever = app.ClauseRetriever(DOCUMENTS, FILENAMES)
+    proc_id = app._PROC_IDS[procedure]
+    assert retriever._retrieve_hyperscan(proc_id) == retriever._retrieve_find(procedure.encode("utf-8"))
+
+
+def test_snippet_window_counts_characters_not_bytes():
+    # "\uf0b7" bullets are 3 bytes each in UTF-8, as in the dataset PDFs.
+    text = "\uf0b7 " * 120 + "Dialysis is covered." + " \uf0a7" * 150
+    retriever = app.ClauseRetriever([text.encode("utf-8")], ["bullets.pdf"])
+    [clause] = retriever._retrieve_find(b"dialysis")
+    i = text.lower().find("dialysis")
+    expected = text[i - 100:i + len("dialysis") + 200].translate(app._WS_TABLE).strip()
+    assert retriever.get_snippet(clause) == expected
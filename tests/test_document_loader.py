@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("fitz")
+
+import app
+
+
+def test_load_documents_reads_txt_as_utf8_bytes(tmp_path):
+    (tmp_path / "policy.txt").write_text("Cataract surgery — covered.", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+    docs, filenames = app.DocumentLoader().load_documents(str(tmp_path))
+    assert (docs, filenames) == (["Cataract surgery — covered.".encode("utf-8")], ["policy.txt"])
+
+
+def test_load_documents_rejects_non_utf8_txt(tmp_path):
+    (tmp_path / "policy.txt").write_bytes("Cataract surgery — covered.".encode("cp1252"))
+    with pytest.raises(UnicodeDecodeError):
+        app.DocumentLoader().load_documents(str(tmp_path))
+
+
+def test_load_documents_missing_folder(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        app.DocumentLoader().load_documents(str(tmp_path / "missing"))
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("fitz")
+
+import app
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("46M, knee surgery, Pune, 3-month policy",
+     {"age": 46, "procedure": "knee surgery", "location": None, "policy_duration_months": 3}),
+    ("35 year old knee replacement in Mumbai, 12 month policy",
+     {"age": 35, "procedure": "knee replacement", "location": "Mumbai", "policy_duration_months": 12}),
+    ("no details here",
+     {"age": None, "procedure": None, "location": None, "policy_duration_months": None}),
+])
+def test_parse(query, expected):
+    assert app.QueryParser().parse(query) == expected
+
+
+# A location match ("in ...", or any word ending in "in") must not hide a
+# procedure that follows it.
+@pytest.mark.parametrize("query, procedure, duration", [
+    ("46M in knee surgery", "knee surgery", None),
+    ("patient in knee replacement ward", "knee replacement", None),
+    ("Berlin hip replacement 3 month policy", "hip replacement", 3),
+    ("Dublin cardiac surgery", "cardiac surgery", None),
+    ("knee pain knee surgery 12 month policy", "knee surgery", 12),
+    ("Bahrain dialysis, 2 month", "dialysis", 2),
+])
+def test_procedure_after_in(query, procedure, duration):
+    parsed = app.QueryParser().parse(query)
+    assert parsed["procedure"] == procedure
+    assert parsed["policy_duration_months"] == duration